@@ -1,229 +1,202 @@
 # backend/app.py
 
 import os
-import time
+import queue
+import atexit
 import logging
-import tempfile
-from io import BytesIO
-from flask import Flask, request, jsonify, send_file
+from time import perf_counter_ns
+from logging.handlers import QueueHandler, QueueListener
+from flask import Flask, Response, request, jsonify
+from flask.json.provider import DefaultJSONProvider
+from flask_compress import Compress
 from flask_cors import CORS
 from dotenv import load_dotenv
-import openai
-import re
+import orjson
 
-# ── Env / OpenAI ──────────────────────────────────────────────────────────────
+# ── Env ───────────────────────────────────────────────────────────────────────
+# Loaded before the local modules below, which read their settings at import.
 load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
-OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
+
+from llm import KEYWORDS_MODEL, OPENAI_MODEL  # noqa: E402
+from routes.bulk import bulk_bp  # noqa: E402
+from routes.common import json_body, needs_content  # noqa: E402
+from routes.keywords import keywords_bp, generate_keywords  # noqa: E402
+from routes.optimize import optimize_bp  # noqa: E402
+from routes.rewrite import rewrite_bp, do_rewrite, rewrite_args  # noqa: E402
+from routes.status import status_bp  # noqa: E402
 
 # ── App setup ─────────────────────────────────────────────────────────────────
-app = Flask(__name__)
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson (used by jsonify).
+
+    Types orjson can't encode natively fall back to Flask's default hook
+    (Decimal, objects with __html__), and non-string keys are coerced like
+    the stdlib encoder does.
+    """
+
+    def _dumpb(self, obj) -> bytes:
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS)
+
+    def dumps(self, obj, **kwargs):
+        return self._dumpb(obj).decode("utf-8")
+
+    def response(self, *args, **kwargs):
+        # Hand orjson's bytes straight to the response, skipping the
+        # decode-to-str and re-encode that the default implementation does.
+        if args and kwargs:
+            raise TypeError("app.json.response() takes either args or kwargs, not both")
+        obj = args[0] if len(args) == 1 else (args or kwargs or None)
+        return self._app.response_class(self._dumpb(obj), mimetype=self.mimetype)
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+app = Flask(__name__, static_folder=None)  # API only; no /static rule
+app.json = OrjsonProvider(app)
 # CORS for /api/* (safe default; restrict origins if you prefer)
 CORS(app, resources={r"/api/*": {"origins": "*"}})
 
-logging.basicConfig(level=logging.INFO)
+# Brotli/gzip for JSON and HTML bodies over 500B (rewrites are prose-heavy HTML);
+# brotli 4 keeps most of the size win at well under a millisecond per response.
+# Covers send_file downloads too; SSE (text/event-stream) is left uncompressed
+# so tokens are not held back in the compressor.
+app.config.update(
+    COMPRESS_ALGORITHM=["br", "gzip"],
+    COMPRESS_MIMETYPES=["application/json", "text/html"],
+    COMPRESS_MIN_SIZE=500,
+    COMPRESS_LEVEL=5,
+    COMPRESS_BR_LEVEL=4,
+)
+Compress(app)
+
+class _RecordQueueHandler(QueueHandler):
+    """Enqueue records as they are; the listener's handler formats them.
+
+    The stock prepare() formats on the calling thread so records can be
+    pickled; this queue never leaves the process, so that work is deferred.
+    """
+
+    def prepare(self, record):
+        return record
+
+# Records are formatted and written by a background listener; request threads
+# only enqueue them, so logging never blocks a response on stderr.
+_log_queue = queue.SimpleQueue()
+_log_stream = logging.StreamHandler()
+_log_stream.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+logging.basicConfig(level=logging.INFO, handlers=[_RecordQueueHandler(_log_queue)])
+_log_listener = QueueListener(_log_queue, _log_stream)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+log = logging.getLogger(__name__)
 
 @app.before_request
 def start_timer():
-    request._start_time = time.time()
+    request._t0 = perf_counter_ns()
 
 @app.after_request
 def log_request(response):
-    try:
-        duration = int((time.time() - getattr(request, "_start_time", time.time())) * 1000)
-        logging.info(f"{request.method} {request.path} -> {response.status_code} in {duration}ms")
-    except Exception:
-        pass
+    # %-style arguments so nothing is formatted when INFO is filtered out
+    if log.isEnabledFor(logging.INFO) and hasattr(request, "_t0"):
+        log.info("%s %s -> %d in %dms", request.method, request.path,
+                 response.status_code, (perf_counter_ns() - request._t0) // 1_000_000)
     return response
 
 # ── Health ────────────────────────────────────────────────────────────────────
 @app.get("/api/health")
 def api_health():
-    return {"status": "ok", "model": OPENAI_MODEL}
-
-# Legacy health (kept for backward compatibility)
-@app.get("/health")
-def legacy_health():
-    return {"status": "ok", "model": OPENAI_MODEL}
-
-# ── Keywords ──────────────────────────────────────────────────────────────────
-@app.post("/api/keywords")
-def api_generate_keywords():
-    data = request.get_json(force=True)
-    content = (data.get("content") or "").strip()
-    audience = (data.get("audience") or "general").lower()
-
-    if not content:
-        return jsonify({"error": "Content is required"}), 400
-
-    audience_hint = {
-        "general": "for a general public audience",
-        "donor": "for donors, philanthropists, and CSR leaders",
-        "journalist": "for journalists and media editors",
-        "policy": "for policy makers and advocacy professionals",
-        "csr teams": "for CSR teams and corporate social impact leads",
-    }.get(audience, "for a general public audience")
-
-    prompt = f"""
-Extract 10 high-quality keyword phrases {audience_hint} from the following content.
-Output one phrase per line. Use multi-word phrases where possible.
-
-Text:
-\"\"\"{content}\"\"\"
-"""
-
-    try:
-        response = openai.ChatCompletion.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": "You are an SEO keyword generator."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-        )
-        lines = response.choices[0].message.content.splitlines()
-        keywords = [line.strip(" -•\t") for line in lines if line.strip()]
-        return jsonify({"keywords": keywords})
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-
-# Legacy route kept (points to the same handler)
-@app.post("/keywords")
-def legacy_generate_keywords():
-    return api_generate_keywords()
-
-# ── Rewrite (returns copyable block + downloadable file) ───────────────────────
-REWRITE_SYS = """Rewrite content into clean, semantic HTML5 with:
-- <article> wrapper, proper <h1..h3>, lists, <section>, <figure>/<figcaption> for images,
-- accessibility-minded (aria-labels only when needed),
-- no external CSS/JS, minimal inline styles,
-- preserve links, add alt text placeholders if missing.
-Return ONLY the HTML inside <article>...</article>."""
-
-def _wrap_full_html(article_html: str) -> str:
-    return f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-  <meta charset="UTF-8" />
-  <meta name="viewport" content="width=device-width,initial-scale=1" />
-  <title>Rewritten Content</title>
-</head>
-<body>
-{article_html}
-</body>
-</html>"""
-
-@app.post("/api/rewrite")
-def api_rewrite_content():
-    data = request.get_json(force=True)
-    content = (data.get("content") or "").strip()
-    audience = (data.get("audience") or "General").strip()
-    keywords = data.get("keywords", [])
-
-    if not content:
-        return jsonify({"error": "Content is required"}), 400
-
-    primary = ", ".join([k for k in keywords][:5]) if keywords else ""
-    user_prompt = f"""Audience: {audience}
-Primary keywords (optional): {primary}
-
-Source:
-\"\"\"{content}\"\"\""""
-
+    # Static per process; let probes and proxies reuse it briefly
+    body = {"status": "ok", "model": OPENAI_MODEL, "keywords_model": KEYWORDS_MODEL}
+    return body, {"Cache-Control": "public, max-age=10"}
+
+# ── API routes ────────────────────────────────────────────────────────────────
+app.register_blueprint(keywords_bp, url_prefix="/api")
+app.register_blueprint(rewrite_bp, url_prefix="/api")
+app.register_blueprint(optimize_bp, url_prefix="/api")
+app.register_blueprint(bulk_bp, url_prefix="/api")
+app.register_blueprint(status_bp, url_prefix="/api")
+
+# ── Legacy routes (kept for backward compatibility) ───────────────────────────
+app.add_url_rule("/health", view_func=api_health, methods=["GET"])
+app.add_url_rule("/keywords", view_func=generate_keywords, methods=["POST"])
+
+# Legacy rewrite (returns {html})
+@app.post("/rewrite")
+@needs_content()
+def legacy_rewrite_content(data):
+    content, audience, keywords = rewrite_args(data)
     try:
-        response = openai.ChatCompletion.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": REWRITE_SYS},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.2,
-        )
-        article_html = response.choices[0].message.content.strip()
-        # Strip fences if model wrapped in ```html
-        if article_html.startswith("```"):
-            article_html = re.sub(r"^```[a-zA-Z]*\n?", "", article_html)
-            article_html = re.sub(r"\n?```$", "", article_html)
-        # Fallback: if no tags detected, wrap minimally
-        if "<" not in article_html and "</" not in article_html:
-            article_html = f"<article><p>{article_html}</p></article>"
-
-        # Build a full HTML file and write to a temp file we can serve
-        full_page = _wrap_full_html(article_html)
-        tmp = tempfile.NamedTemporaryFile("w", delete=False, suffix=".html", prefix="rewrite_")
-        tmp.write(full_page)
-        tmp.close()
-        fid = os.path.basename(tmp.name)
-        download_path = f"/api/rewrite/download/{fid}"
-
-        return jsonify({"data": {"html_block": article_html, "download_path": download_path}})
+        return jsonify({"html": do_rewrite(content, audience, keywords)["html_block"]})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@app.get("/api/rewrite/download/<fid>")
-def api_rewrite_download(fid):
-    path = os.path.join(tempfile.gettempdir(), fid)
-    if not os.path.exists(path):
-        return jsonify({"error": "File not found"}), 404
-    return send_file(path, mimetype="text/html", as_attachment=True, download_name="rewritten.html")
-
-# ── Legacy rewrite (kept; returns {html}) ──────────────────────────────────────
-@app.post("/rewrite")
-def legacy_rewrite_content():
-    # call the new handler and adapt response for old clients
-    resp = api_rewrite_content()
-    if isinstance(resp, tuple):
-        payload, code = resp
-        if code != 200:
-            return resp
-        data = payload.get_json() or {}
-    else:
-        data = resp.get_json() or {}
-    html_block = (data.get("data", {}) or {}).get("html_block", "")
-    return jsonify({"html": html_block})
-
 # Legacy download endpoint (build full page from posted fragment; kept)
-@app.post("/download")
-def legacy_download_html():
-    data = request.get_json(force=True)
-    html_fragment = (data.get("html") or "").strip()
-    if not html_fragment:
-        return jsonify({"error": "html is required"}), 400
-
-    full_page = f"""<!DOCTYPE html>
+# The handful of Tailwind utilities the page uses, written out by hand so the
+# downloaded file opens offline instead of pulling the Tailwind CDN script.
+_PROSE_CSS = """
+    *, ::before, ::after { box-sizing: border-box; }
+    body { margin: 0; font-family: ui-sans-serif, system-ui, sans-serif; line-height: 1.5; }
+    .bg-gray-50 { background: #f9fafb; }
+    .text-gray-900 { color: #111827; }
+    .max-w-4xl { max-width: 56rem; }
+    .mx-auto { margin-left: auto; margin-right: auto; }
+    .p-6 { padding: 1.5rem; }
+    .text-sm { font-size: .875rem; line-height: 1.25rem; }
+    .text-gray-500 { color: #6b7280; }
+    .mb-2 { margin-bottom: .5rem; }
+    .bg-white { background: #fff; }
+    .border { border-width: 1px; border-style: solid; }
+    .border-gray-200 { border-color: #e5e7eb; }
+    .rounded-xl { border-radius: .75rem; }
+    .prose h1 { font-size: 2rem; margin-bottom: 1rem; }
+    .prose h2 { font-size: 1.5rem; margin-top: 1.25rem; margin-bottom: .75rem; }
+    .prose p { margin: .75rem 0; line-height: 1.6; }
+    .prose ul { margin: .75rem 0 1rem 1.5rem; }
+"""
+_DOWNLOAD_PAGE_HEAD = f"""<!DOCTYPE html>
 <html lang="en">
 <head>
   <meta charset="UTF-8">
   <meta name="viewport" content="width=device-width, initial-scale=1.0">
   <title>Optimized Content</title>
-  <script src="https://cdn.tailwindcss.com"></script>
-  <style>
-    .prose h1 {{ font-size: 2rem; margin-bottom: 1rem; }}
-    .prose h2 {{ font-size: 1.5rem; margin-top: 1.25rem; margin-bottom: .75rem; }}
-    .prose p {{ margin: .75rem 0; line-height: 1.6; }}
-    .prose ul {{ margin: .75rem 0 1rem 1.5rem; }}
-  </style>
+  <style>{_PROSE_CSS}  </style>
 </head>
 <body class="bg-gray-50 text-gray-900">
   <div class="max-w-4xl mx-auto p-6">
     <header class="text-sm text-gray-500 mb-2">Downloaded preview — full HTML page</header>
     <article class="prose max-w-none bg-white border border-gray-200 rounded-xl p-6">
-      {html_fragment}
+      """.encode("utf-8")
+_DOWNLOAD_PAGE_TAIL = """
     </article>
   </div>
 </body>
-</html>"""
+</html>""".encode("utf-8")
 
-    buf = BytesIO(full_page.encode("utf-8"))
-    return send_file(buf, mimetype="text/html", as_attachment=True, download_name="optimized.html")
+@app.post("/download")
+def legacy_download_html():
+    data = json_body()
+    html_fragment = (data.get("html") or "").strip()
+    if not html_fragment:
+        return jsonify({"error": "html is required"}), 400
+
+    # Head, fragment and tail go out as separate chunks with the length known up
+    # front. The page is always above COMPRESS_MIN_SIZE, so for clients sending
+    # Accept-Encoding (every browser) flask-compress joins the chunks and
+    # compresses the whole page; only identity responses skip that copy.
+    body = html_fragment.encode("utf-8")
+    return Response(
+        [_DOWNLOAD_PAGE_HEAD, body, _DOWNLOAD_PAGE_TAIL],
+        mimetype="text/html",
+        headers={
+            "Content-Disposition": 'attachment; filename="optimized.html"',
+            "Content-Length": str(len(_DOWNLOAD_PAGE_HEAD) + len(body) + len(_DOWNLOAD_PAGE_TAIL)),
+        },
+    )
 
 # ── Entrypoint ────────────────────────────────────────────────────────────────
+# Local development only; production runs under gunicorn (see gunicorn.conf.py):
+#   gunicorn app:app
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))
-    app.run(host="0.0.0.0", port=port, debug=True)
-
-
-
-
-
-
+    app.run(host="0.0.0.0", port=port, debug=os.getenv("FLASK_DEBUG") == "1")
@@ -0,0 +1,62 @@
+# backend/batcher.py
+"""Micro-batching: coalesce concurrent calls into one batched call.
+
+Callers block in `submit(item)`; items arriving within `window` seconds of the
+first (or until `max_size` are waiting) are handed to `run_batch(items)` as a
+single list, whose results are routed back to each caller in order. Threads
+and Futures rather than asyncio, so it works the same under gevent workers.
+"""
+
+import threading
+from concurrent.futures import Future
+
+class MicroBatcher:
+    def __init__(self, run_batch, max_size: int = 8, window: float = 0.05):
+        self.run_batch = run_batch
+        self.max_size = max_size
+        self.window = window
+        self._pending = []  # (item, Future)
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def submit(self, item):
+        """Queue `item` for the next batch and block until its result is ready."""
+        future = Future()
+        with self._lock:
+            self._pending.append((item, future))
+            batch = self._take() if len(self._pending) >= self.max_size else None
+            if batch is None and self._timer is None:
+                self._timer = threading.Timer(self.window, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if batch:
+            self._run(batch)  # a full batch runs on the caller that filled it
+        return future.result()
+
+    def _take(self):
+        """Detach the pending batch. Call under _lock."""
+        batch, self._pending = self._pending, []
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _flush(self):
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._run(batch)
+
+    def _run(self, batch):
+        try:
+            results = self.run_batch([item for item, _ in batch])
+        except BaseException as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        results = list(results)
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+        # A short result list must not leave callers blocked in future.result()
+        for _, future in batch[len(results):]:
+            future.set_exception(RuntimeError(f"batch returned {len(results)} results for {len(batch)} items"))
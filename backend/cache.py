@@ -0,0 +1,271 @@
+# backend/cache.py
+"""Response cache for the LLM-backed endpoints.
+
+Two tiers sit in front of every completion:
+- exact: BLAKE2b of (scope, model, request context, content) in a TTL cache,
+  optionally shared across processes in Redis (REDIS_URL) and/or persisted to
+  disk with diskcache (CACHE_DIR);
+- semantic (opt-in): an embedding of the normalized content is compared
+  against earlier requests with the same context; a cosine similarity at or above
+  SEMANTIC_CACHE_THRESHOLD reuses the stored completion. Each scope can set its
+  own threshold (SEMANTIC_CACHE_THRESHOLD_REWRITE=0.99, ...), and with CACHE_DIR
+  the indexes are saved every SEMANTIC_PERSIST_EVERY additions and at exit.
+
+Handlers call `probe()` before the OpenAI call and either `get_or_compute()`
+(which also collapses concurrent identical misses into one call) or, for
+streamed replies, `store()` after it. Keys include PROMPT_VERSION; bump it
+whenever a prompt changes so stale completions stop being served.
+"""
+
+import os
+import time
+import logging
+import atexit
+import hashlib
+import threading
+from functools import lru_cache
+from concurrent.futures import Future
+
+import numpy as np
+from cachetools import TTLCache
+
+from openai_client import client
+
+PROMPT_VERSION = "2"
+
+CACHE_TTL = int(os.getenv("CACHE_TTL", 86400))
+CACHE_MAXSIZE = int(os.getenv("CACHE_MAXSIZE", 10_000))
+CACHE_DIR = os.getenv("CACHE_DIR")
+REDIS_URL = os.getenv("REDIS_URL")
+
+# 0 (default) disables the semantic tier; 0.97 is a sensible starting point.
+SEMANTIC_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD") or 0)
+SEMANTIC_MAXSIZE = int(os.getenv("SEMANTIC_CACHE_MAXSIZE", 1000))
+SEMANTIC_PERSIST_EVERY = int(os.getenv("SEMANTIC_PERSIST_EVERY", 50))
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+
+log = logging.getLogger(__name__)
+
+_memory = TTLCache(maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL)
+_lock = threading.Lock()
+
+if CACHE_DIR:
+    import diskcache
+    _disk = diskcache.Cache(CACHE_DIR)
+else:
+    _disk = None
+
+if REDIS_URL:
+    import redis
+    # Short timeouts: a slow or absent Redis degrades to a cache miss, not a stall
+    _redis = redis.Redis.from_url(
+        REDIS_URL, decode_responses=True, socket_connect_timeout=1, socket_timeout=1
+    )
+else:
+    _redis = None
+
+def make_key(*parts: str) -> str:
+    return hashlib.blake2b("|".join(parts).encode("utf-8"), digest_size=32).hexdigest()
+
+def _redis_get(key: str):
+    try:
+        return _redis.get("oai:" + key)
+    except redis.RedisError as e:
+        log.warning("redis cache: get failed: %s", e)
+        return None
+
+def _redis_set(key: str, value: str) -> None:
+    try:
+        _redis.set("oai:" + key, value, ex=CACHE_TTL)
+    except redis.RedisError as e:
+        log.warning("redis cache: set failed: %s", e)
+
+class _SemanticIndex:
+    """Brute-force inner-product index over unit vectors (tiny, so no ANN needed)."""
+
+    def __init__(self, vectors=None, entries=None):
+        self.vectors = vectors if vectors is not None else np.empty((0, 0), dtype=np.float32)
+        self.entries = entries or []  # (stored_at, value), parallel to vectors
+        self.unsaved = 0
+
+    def search(self, vector):
+        if not self.entries:
+            return None, 0.0
+        # Expired rows are masked out first, so a stale best match can't hide
+        # a fresh runner-up
+        oldest = time.time() - CACHE_TTL
+        fresh = np.fromiter((t >= oldest for t, _ in self.entries), dtype=bool, count=len(self.entries))
+        if not fresh.any():
+            return None, 0.0
+        scores = np.where(fresh, self.vectors @ vector, -np.inf)
+        i = int(np.argmax(scores))
+        return self.entries[i][1], float(scores[i])
+
+    def add(self, vector, value):
+        if self.entries:
+            self.vectors = np.vstack([self.vectors, vector])
+        else:
+            self.vectors = vector[np.newaxis, :]
+        self.entries.append((time.time(), value))
+        self.unsaved += 1
+        if len(self.entries) > SEMANTIC_MAXSIZE:
+            self.vectors = self.vectors[1:]
+            self.entries.pop(0)
+
+_indexes = {}  # context key -> _SemanticIndex
+# Saved indexes are keyed by embedding model too: vectors from another model
+# have a different width and can't be searched with this one's.
+_INDEX_PREFIX = f"semantic:{EMBEDDING_MODEL}:"
+
+@lru_cache(maxsize=None)
+def _threshold(scope: str) -> float:
+    """Similarity needed for a semantic hit in `scope`; 0 disables the tier."""
+    return float(os.getenv(f"SEMANTIC_CACHE_THRESHOLD_{scope.upper()}") or SEMANTIC_THRESHOLD)
+
+def _index(ctx: str) -> _SemanticIndex:
+    """The semantic index for a context, loading a saved one on first use.
+
+    The disk read and unpickling happen outside _lock, so a cold load doesn't
+    stall other probes; if two threads race, the first index inserted wins.
+    """
+    with _lock:
+        index = _indexes.get(ctx)
+    if index is not None:
+        return index
+    saved = _disk.get(_INDEX_PREFIX + ctx) if _disk is not None else None
+    index = _SemanticIndex(*saved) if saved is not None else _SemanticIndex()
+    with _lock:
+        return _indexes.setdefault(ctx, index)
+
+def _snapshot(index: _SemanticIndex):
+    """An index's saveable state, marked as saved. Call under _lock."""
+    index.unsaved = 0
+    return index.vectors, list(index.entries)
+
+def _persist(ctx: str, snapshot) -> None:
+    """Save a snapshot of an index to the disk cache."""
+    _disk.set(_INDEX_PREFIX + ctx, snapshot, expire=CACHE_TTL)
+
+@atexit.register
+def _persist_all() -> None:
+    if _disk is None:
+        return
+    with _lock:
+        snapshots = [(ctx, _snapshot(index)) for ctx, index in _indexes.items() if index.unsaved]
+    for ctx, snapshot in snapshots:
+        _persist(ctx, snapshot)
+
+_embeddings = TTLCache(maxsize=SEMANTIC_MAXSIZE, ttl=CACHE_TTL)  # normalized text key -> unit vector
+
+def _normalize(content: str) -> str:
+    """Case and whitespace don't change meaning; folding them raises the hit rate."""
+    return " ".join(content.lower().split())
+
+def _embed(content: str):
+    text = _normalize(content)
+    key = make_key(EMBEDDING_MODEL, text)
+    with _lock:
+        vector = _embeddings.get(key)
+    if vector is not None:
+        return vector
+    try:
+        resp = client.embeddings.create(model=EMBEDDING_MODEL, input=text)
+    except Exception as e:
+        log.warning("semantic cache: embedding failed: %s", e)
+        return None
+    vector = np.asarray(resp.data[0].embedding, dtype=np.float32)
+    vector /= np.linalg.norm(vector) or 1.0
+    # The same text is often probed under several scopes (keywords, then rewrite)
+    with _lock:
+        _embeddings[key] = vector
+    return vector
+
+class Probe:
+    """Result of a cache lookup; pass it back to `store()` on a miss."""
+
+    __slots__ = ("context", "key", "vector", "value")
+
+    def __init__(self, context, key, vector=None, value=None):
+        self.context = context
+        self.key = key
+        self.vector = vector
+        self.value = value
+
+def probe(scope: str, content: str, *context: str) -> Probe:
+    """Look up a cached completion for `content` under `scope` and `context`."""
+    ctx = make_key(PROMPT_VERSION, scope, *context)
+    p = Probe(ctx, make_key(ctx, content))
+
+    with _lock:
+        p.value = _memory.get(p.key)
+    if p.value is None:
+        if _redis is not None:
+            p.value = _redis_get(p.key)
+        if p.value is None and _disk is not None:
+            p.value = _disk.get(p.key)
+        if p.value is not None:
+            with _lock:
+                _memory[p.key] = p.value
+    threshold = _threshold(scope)
+    if p.value is not None or not threshold:
+        return p
+
+    p.vector = _embed(content)
+    if p.vector is not None:
+        index = _index(ctx)
+        with _lock:
+            value, score = index.search(p.vector)
+        if score >= threshold:
+            log.info("semantic cache hit (%.3f) for %s", score, scope)
+            p.value = value
+    return p
+
+def store(p: Probe, value: str) -> None:
+    """Remember `value` as the completion for a probed request."""
+    index = _index(p.context) if p.vector is not None else None
+    snapshot = None
+    with _lock:
+        _memory[p.key] = value
+        if index is not None:
+            index.add(p.vector, value)
+            if _disk is not None and index.unsaved >= SEMANTIC_PERSIST_EVERY:
+                snapshot = _snapshot(index)
+    if snapshot is not None:
+        _persist(p.context, snapshot)
+    if _redis is not None:
+        _redis_set(p.key, value)
+    if _disk is not None:
+        _disk.set(p.key, value, expire=CACHE_TTL)
+
+# Cache key -> Future of the value being computed for it, so a burst of
+# identical requests (e.g. client retries) makes one upstream call.
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+def get_or_compute(p: Probe, compute) -> str:
+    """Return the probed value, or run `compute()` once per key, store and return it.
+
+    Concurrent misses for the same key wait for the first caller's result (or
+    its exception) instead of computing again.
+    """
+    if p.value is not None:
+        return p.value
+    with _inflight_lock:
+        future = _inflight.get(p.key)
+        leader = future is None
+        if leader:
+            future = _inflight[p.key] = Future()
+    if not leader:
+        return future.result()
+
+    try:
+        value = compute()
+        store(p, value)
+        future.set_result(value)
+        return value
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            del _inflight[p.key]
@@ -0,0 +1,41 @@
+# backend/downloads.py
+"""Bounded in-memory store for rewritten pages awaiting download.
+
+Replaces writing every rewrite to a temp file: no disk I/O on the request
+path, nothing left behind in /tmp, and ids are opaque tokens rather than
+file names. Least recently used pages are evicted once the store exceeds
+DOWNLOAD_STORE_MAX_MB or DOWNLOAD_STORE_MAX_PAGES. The store is per process,
+like the response cache.
+"""
+
+import os
+import secrets
+import threading
+from collections import OrderedDict
+
+MAX_BYTES = int(os.getenv("DOWNLOAD_STORE_MAX_MB", 64)) * 1024 * 1024
+MAX_PAGES = int(os.getenv("DOWNLOAD_STORE_MAX_PAGES", 512))
+
+_pages: "OrderedDict[str, bytes]" = OrderedDict()
+_size = 0
+_lock = threading.Lock()
+
+def put(page: bytes) -> str:
+    """Store a page and return the id it can be downloaded under."""
+    global _size
+    fid = secrets.token_urlsafe(16)
+    with _lock:
+        _pages[fid] = page
+        _size += len(page)
+        while (_size > MAX_BYTES or len(_pages) > MAX_PAGES) and len(_pages) > 1:
+            _, evicted = _pages.popitem(last=False)
+            _size -= len(evicted)
+    return fid
+
+def get(fid: str):
+    """Return the stored page, or None if it is unknown or was evicted."""
+    with _lock:
+        page = _pages.get(fid)
+        if page is not None:
+            _pages.move_to_end(fid)  # a fetched page is likely to be fetched again
+        return page
@@ -0,0 +1,16 @@
+# backend/gunicorn.conf.py
+# Picked up automatically by `gunicorn app:app` when started from backend/.
+
+import os
+
+# ── Workers ───────────────────────────────────────────────────────────────────
+# Requests spend nearly all their time waiting on OpenAI, not on CPU. A gevent
+# worker multiplexes those waits on one event loop, so concurrency is bounded by
+# connections rather than by the number of worker processes.
+worker_class = "gevent"
+workers = int(os.getenv("WEB_CONCURRENCY", 1))
+worker_connections = 1000
+
+# Long rewrites can take a minute or more of OpenAI time, plus rate-limit backoff.
+timeout = 120
+bind = f"0.0.0.0:{os.getenv('PORT', 8000)}"
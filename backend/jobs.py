@@ -0,0 +1,44 @@
+# backend/jobs.py
+"""Background jobs for slow requests, polled by id.
+
+A request with `?async=1` is answered with 202 and a task id straight away
+while the work runs on a bounded pool; GET /api/status/<id> returns its state
+and, once finished, the result. Finished and pending jobs are kept for the
+most recent JOBS_MAX_KEPT submissions. Like the cache, jobs are per process.
+"""
+
+import os
+import secrets
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+JOBS_CONCURRENCY = int(os.getenv("JOBS_CONCURRENCY", 16))
+JOBS_MAX_KEPT = int(os.getenv("JOBS_MAX_KEPT", 1000))
+
+_pool = ThreadPoolExecutor(max_workers=JOBS_CONCURRENCY)
+_jobs: "OrderedDict[str, object]" = OrderedDict()  # id -> Future
+_lock = threading.Lock()
+
+def submit(fn, *args) -> str:
+    """Run `fn(*args)` in the background and return the id to poll."""
+    tid = secrets.token_urlsafe(16)
+    future = _pool.submit(fn, *args)
+    with _lock:
+        _jobs[tid] = future
+        while len(_jobs) > JOBS_MAX_KEPT:
+            _jobs.popitem(last=False)
+    return tid
+
+def status(tid: str):
+    """{state, result|error} for a job, or None if it is unknown or was evicted."""
+    with _lock:
+        future = _jobs.get(tid)
+    if future is None:
+        return None
+    if not future.done():
+        return {"state": "PENDING"}
+    error = future.exception()
+    if error is not None:
+        return {"state": "FAILURE", "error": str(error)}
+    return {"state": "SUCCESS", "result": future.result()}
@@ -0,0 +1,62 @@
+# backend/llm.py
+"""OpenAI calls shared by the API routes: rate limiting, usage logging, caching."""
+
+import os
+import logging
+
+import cache
+from openai_client import client
+from ratelimit import RateLimiter, estimate_tokens
+
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
+# Keyword extraction is a light task; a small model answers it several times
+# faster and far cheaper. Rewrites and /analyze stay on OPENAI_MODEL.
+KEYWORDS_MODEL = os.getenv("KEYWORDS_MODEL", "gpt-4o-mini")
+
+# Per-process budgets; defaults match usage tier 1 for gpt-4o and gpt-4o-mini.
+# OpenAI limits are per model, so each model gets its own bucket. With several
+# worker processes, give each its share of the account limits.
+OPENAI_MAX_RPM = float(os.getenv("OPENAI_MAX_RPM", 500))
+OPENAI_MAX_TPM = float(os.getenv("OPENAI_MAX_TPM", 30_000))
+KEYWORDS_MAX_RPM = float(os.getenv("KEYWORDS_MAX_RPM", 500))
+KEYWORDS_MAX_TPM = float(os.getenv("KEYWORDS_MAX_TPM", 200_000))
+limiter = RateLimiter(OPENAI_MAX_RPM, OPENAI_MAX_TPM)
+_limiters = {OPENAI_MODEL: limiter}
+_limiters.setdefault(KEYWORDS_MODEL, RateLimiter(KEYWORDS_MAX_RPM, KEYWORDS_MAX_TPM))
+
+def prompt_cache_key(scope: str) -> str:
+    """OpenAI `prompt_cache_key` for a route's prompts.
+
+    Requests sharing a long static prefix (the rewrite style guide) are routed
+    to the same cache shard, which raises OpenAI's cached-input hit rate.
+    """
+    return f"{scope}-v{cache.PROMPT_VERSION}"
+
+def create_completion(model=OPENAI_MODEL, **create_kwargs):
+    """chat.completions.create behind the rate limiter (the client retries failures)."""
+    _limiters.get(model, limiter).acquire(estimate_tokens(create_kwargs["messages"], create_kwargs.get("max_tokens")))
+    # Sent as a raw body field: older SDKs in the supported range have no
+    # prompt_cache_key argument and would reject it.
+    if "prompt_cache_key" in create_kwargs:
+        create_kwargs["extra_body"] = {"prompt_cache_key": create_kwargs.pop("prompt_cache_key")}
+    return client.chat.completions.create(model=model, **create_kwargs)
+
+def log_usage(usage):
+    """Log token usage, including prompt tokens served from OpenAI's prompt cache."""
+    if not usage:
+        return
+    cached = getattr(usage.prompt_tokens_details, "cached_tokens", None) or 0
+    logging.info(
+        "openai usage: prompt=%s cached=%s completion=%s",
+        usage.prompt_tokens, cached, usage.completion_tokens,
+    )
+
+def fetch_text(**create_kwargs) -> str:
+    """Text of one non-streamed completion, with its usage logged."""
+    response = create_completion(**create_kwargs)
+    log_usage(response.usage)
+    return response.choices[0].message.content
+
+def complete(probe, fetch=fetch_text, **create_kwargs) -> str:
+    """Return the completion text for a probed request, calling `fetch` on a miss."""
+    return cache.get_or_compute(probe, lambda: fetch(**create_kwargs))
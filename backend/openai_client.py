@@ -0,0 +1,34 @@
+# backend/openai_client.py
+"""The process-wide OpenAI client.
+
+One client means one httpx connection pool: HTTP/2 multiplexes concurrent calls
+over a few kept-alive TLS connections instead of a handshake per call.
+"""
+
+import os
+import atexit
+
+import httpx
+from openai import OpenAI
+
+OPENAI_REQUEST_TIMEOUT = float(os.getenv("OPENAI_REQUEST_TIMEOUT", 120))
+# The SDK retries 408/409/429/5xx and dropped connections with exponential
+# backoff and jitter, honouring Retry-After.
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", 3))
+
+API_KEY_CONFIGURED = bool(os.getenv("OPENAI_API_KEY"))
+
+# A placeholder key lets the app boot (and /health answer) without
+# OPENAI_API_KEY; the API routes refuse requests up front in that case.
+client = OpenAI(
+    api_key=os.getenv("OPENAI_API_KEY") or "unset",
+    max_retries=OPENAI_MAX_RETRIES,
+    # Sized for a gevent worker's concurrency; the httpx default of 100
+    # connections would surface as PoolTimeout under bulk load.
+    http_client=httpx.Client(
+        http2=True,
+        limits=httpx.Limits(max_connections=200, max_keepalive_connections=100, keepalive_expiry=30),
+        timeout=httpx.Timeout(OPENAI_REQUEST_TIMEOUT, connect=5.0),
+    ),
+)
+atexit.register(client.close)
@@ -0,0 +1,91 @@
+# backend/preprocess.py
+"""Input clean-up before content is sent to OpenAI.
+
+Prompt tokens drive both cost and prefill latency, and pasted content is
+often padded: runs of spaces, blank lines, repeated boilerplate paragraphs
+(footers, disclaimers), or whole HTML pages. Normalizing also makes the
+cache key stable across such noise.
+"""
+
+import os
+import re
+import html
+import time
+import logging
+
+from llm import OPENAI_MODEL
+
+log = logging.getLogger(__name__)
+
+# Keyword extraction only needs the gist; ~3k tokens of text is plenty. A
+# rewrite is about as long as its source, so its budget stays well inside the
+# model's output limit.
+KEYWORDS_MAX_TOKENS = int(os.getenv("KEYWORDS_MAX_TOKENS", 3_000))
+REWRITE_MAX_TOKENS = int(os.getenv("REWRITE_MAX_TOKENS", 12_000))
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_INLINE_SPACE = re.compile(r"[ \t\f\v\u00a0]+")
+_DROP_BLOCKS = re.compile(r"<(script|style|head|nav|footer)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_TAG = re.compile(r"<[^>]+>")
+_LOOKS_LIKE_HTML = re.compile(r"<(?:[a-zA-Z][a-zA-Z0-9]*)(?:\s[^>]*)?>")
+
+def normalize(content: str) -> str:
+    """Collapse inline whitespace and drop repeated paragraphs, keeping line structure."""
+    seen = set()
+    paragraphs = []
+    for para in _PARAGRAPH_BREAK.split(content):
+        lines = (_INLINE_SPACE.sub(" ", line).strip() for line in para.splitlines())
+        para = "\n".join(line for line in lines if line)
+        if para and para not in seen:
+            seen.add(para)
+            paragraphs.append(para)
+    return "\n\n".join(paragraphs)
+
+def strip_html(content: str) -> str:
+    """Visible text of an HTML document or fragment."""
+    text = _DROP_BLOCKS.sub(" ", content)
+    text = _TAG.sub("\n", text)
+    return html.unescape(text)
+
+# A failed tiktoken load (often a transient error fetching the BPE file) is
+# retried after this many seconds instead of being remembered for good.
+_ENCODING_RETRY_SECONDS = 300
+_encodings = {}  # model -> tiktoken Encoding
+_encoding_retry_at = 0.0
+
+def _encoding(model: str):
+    """The model's tiktoken encoding, or None while tiktoken or its data is unavailable."""
+    global _encoding_retry_at
+    enc = _encodings.get(model)
+    if enc is not None or time.monotonic() < _encoding_retry_at:
+        return enc
+    try:
+        import tiktoken
+        try:
+            enc = tiktoken.encoding_for_model(model)
+        except KeyError:
+            enc = tiktoken.get_encoding("o200k_base")
+    except Exception as e:  # not installed, or the BPE file can't be fetched
+        _encoding_retry_at = time.monotonic() + _ENCODING_RETRY_SECONDS
+        log.warning("tiktoken unavailable, clamping by characters for %ds: %s", _ENCODING_RETRY_SECONDS, e)
+        return None
+    _encodings[model] = enc
+    return enc
+
+def clamp_tokens(text: str, budget: int) -> str:
+    """Truncate `text` to at most `budget` tokens of OPENAI_MODEL's encoding."""
+    enc = _encoding(OPENAI_MODEL)
+    if enc is None:
+        return text[:budget * 4]  # ~4 characters per token
+    tokens = enc.encode(text, disallowed_special=())
+    return enc.decode(tokens[:budget]) if len(tokens) > budget else text
+
+def keyword_source(content: str) -> str:
+    """Plain, compact text for keyword extraction, clamped to KEYWORDS_MAX_TOKENS."""
+    if _LOOKS_LIKE_HTML.search(content):
+        content = strip_html(content)
+    return clamp_tokens(" ".join(normalize(content).split()), KEYWORDS_MAX_TOKENS)
+
+def rewrite_source(content: str) -> str:
+    """Normalized rewrite input, clamped to REWRITE_MAX_TOKENS."""
+    return clamp_tokens(normalize(content), REWRITE_MAX_TOKENS)
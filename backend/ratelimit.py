@@ -0,0 +1,58 @@
+# backend/ratelimit.py
+"""Client-side request/token budget for OpenAI calls.
+
+A token bucket modelled on the OpenAI cookbook's api_request_parallel_processor:
+capacity refills continuously from the per-minute limits, and `acquire()` blocks
+until both one request and the estimated tokens are available. Admitting calls
+only when budget permits avoids most 429s during bursts instead of paying for
+them with failed round trips.
+"""
+
+import time
+import threading
+
+def estimate_tokens(messages, max_tokens=None) -> int:
+    """Rough token cost of a chat call: ~4 characters per prompt token, plus output."""
+    prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 4 + 4 * len(messages)
+    # Without an explicit cap, assume the reply is about as long as the prompt
+    # (true for rewrites, generous for keyword lists).
+    return prompt_tokens + (max_tokens if max_tokens is not None else prompt_tokens)
+
+class RateLimiter:
+    def __init__(self, max_requests_per_minute: float, max_tokens_per_minute: float):
+        self.max_requests_per_minute = max_requests_per_minute
+        self.max_tokens_per_minute = max_tokens_per_minute
+        self.available_request_capacity = max_requests_per_minute
+        self.available_token_capacity = max_tokens_per_minute
+        self._last_update = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._last_update
+        self._last_update = now
+        self.available_request_capacity = min(
+            self.max_requests_per_minute,
+            self.available_request_capacity + self.max_requests_per_minute * elapsed / 60,
+        )
+        self.available_token_capacity = min(
+            self.max_tokens_per_minute,
+            self.available_token_capacity + self.max_tokens_per_minute * elapsed / 60,
+        )
+
+    def acquire(self, tokens: int) -> None:
+        """Block until one request and `tokens` tokens fit in the budget, then spend them."""
+        # A single call larger than the whole per-minute budget waits for a full bucket.
+        tokens = min(tokens, self.max_tokens_per_minute)
+        while True:
+            with self._lock:
+                self._refill()
+                if self.available_request_capacity >= 1 and self.available_token_capacity >= tokens:
+                    self.available_request_capacity -= 1
+                    self.available_token_capacity -= tokens
+                    return
+                wait = max(
+                    (1 - self.available_request_capacity) * 60 / self.max_requests_per_minute,
+                    (tokens - self.available_token_capacity) * 60 / self.max_tokens_per_minute,
+                )
+            time.sleep(max(wait, 0.01))
@@ -0,0 +1,119 @@
+# backend/routes/bulk.py
+"""Asynchronous bulk jobs on the OpenAI Batch API.
+
+Batch requests cost half as much as live calls and draw on a separate rate
+limit pool, at the price of latency (results within 24h, usually minutes).
+POST /bulk submits one chat completion per document and returns a batch id;
+GET /bulk/<id> reports progress and, once complete, the parsed results.
+"""
+
+from io import BytesIO
+
+import orjson
+from flask import Blueprint, jsonify
+
+from llm import OPENAI_MODEL
+from openai_client import client
+from routes.common import needs_content
+from routes.keywords import keywords_kwargs, parse_keywords
+from routes.rewrite import clean_rewrite, rewrite_kwargs
+
+bulk_bp = Blueprint("bulk", __name__)
+
+BULK_MAX_ITEMS = 1000
+_ENDPOINT = "/v1/chat/completions"
+
+_FINALIZE = {
+    "keywords": lambda text: {"keywords": parse_keywords(text)},
+    # HTML inline, not via the download store: a batch of up to BULK_MAX_ITEMS
+    # pages re-finalized on every poll would evict its own pages and everyone
+    # else's from the bounded store.
+    "rewrite": lambda text: {"html_block": clean_rewrite(text)},
+}
+
+def submit_batch(requests: list, task: str) -> str:
+    """Upload chat completion bodies as a JSONL batch and return the batch id."""
+    buf = BytesIO()
+    for i, body in enumerate(requests):
+        line = {"custom_id": f"item-{i}", "method": "POST", "url": _ENDPOINT, "body": body}
+        buf.write(orjson.dumps(line))
+        buf.write(b"\n")
+    upload = client.files.create(file=("batch.jsonl", buf.getvalue()), purpose="batch")
+    batch = client.batches.create(
+        input_file_id=upload.id,
+        endpoint=_ENDPOINT,
+        completion_window="24h",
+        metadata={"task": task},
+    )
+    return batch.id
+
+def _batch_results(batch, task: str) -> list:
+    """Parse a finished batch's output and error files into results in submission order."""
+    finalize = _FINALIZE[task]
+    results = {}
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        for line in client.files.content(file_id).content.splitlines():
+            if not line.strip():
+                continue
+            item = orjson.loads(line)
+            i = int(item["custom_id"].removeprefix("item-"))
+            response = item.get("response") or {}
+            if item.get("error") or response.get("status_code") != 200:
+                error = item.get("error") or (response.get("body") or {}).get("error") or {}
+                results[i] = {"error": error.get("message", "request failed")}
+                continue
+            results[i] = finalize(response["body"]["choices"][0]["message"]["content"])
+    return [results.get(i, {"error": "no result"}) for i in range(batch.request_counts.total)]
+
+@bulk_bp.post("/bulk")
+@needs_content(allow_list=True)
+def bulk_submit(data):
+    task = data.get("task") or "keywords"
+    audience = (data.get("audience") or "general").strip()
+    keywords = data.get("keywords", [])
+    content = data.get("content")
+
+    if task not in _FINALIZE:
+        return jsonify({"error": "task must be 'keywords' or 'rewrite'"}), 400
+    contents = [(c or "").strip() for c in content if isinstance(c, str)] if isinstance(content, list) else []
+    if not contents or len(contents) != len(content) or not all(contents):
+        return jsonify({"error": "content must be a non-empty list of non-empty strings"}), 400
+    if len(contents) > BULK_MAX_ITEMS:
+        return jsonify({"error": f"At most {BULK_MAX_ITEMS} items per request"}), 400
+
+    # Request bodies only: batch results never go through the cache, so there
+    # is nothing to probe (and no embedding call per item).
+    bodies = []
+    for c in contents:
+        if task == "keywords":
+            create_kwargs = keywords_kwargs(c, audience)
+        else:
+            create_kwargs = rewrite_kwargs(c, audience, keywords)
+        bodies.append({"model": OPENAI_MODEL, **create_kwargs})
+    try:
+        batch_id = submit_batch(bodies, task)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify({"batch_id": batch_id, "status": "validating"}), 202
+
+@bulk_bp.get("/bulk/<batch_id>")
+def bulk_status(batch_id):
+    try:
+        batch = client.batches.retrieve(batch_id)
+        # Only batches submitted here (tagged with their task) are exposed;
+        # others on the same API key are not ours to report or download.
+        task = (batch.metadata or {}).get("task")
+        if task not in _FINALIZE:
+            return jsonify({"error": "Batch not found"}), 404
+        status = {
+            "batch_id": batch.id,
+            "status": batch.status,
+            "request_counts": batch.request_counts.model_dump() if batch.request_counts else None,
+        }
+        if batch.status == "completed":
+            status["data"] = _batch_results(batch, task)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify(status)
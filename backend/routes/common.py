@@ -0,0 +1,135 @@
+# backend/routes/common.py
+"""Request parsing and response helpers shared by the API blueprints."""
+
+from functools import wraps
+
+import orjson
+from flask import Response, request, jsonify
+from werkzeug.exceptions import BadRequest
+
+import cache
+import jobs
+from llm import complete, create_completion, fetch_text, log_usage
+from openai_client import API_KEY_CONFIGURED
+
+def _bad_request(message: str) -> BadRequest:
+    """A 400 that answers with the API's JSON error shape instead of an HTML page."""
+    response = jsonify({"error": message})
+    response.status_code = 400
+    return BadRequest(message, response=response)
+
+def json_body() -> dict:
+    """Decode the request body with orjson (read once; handlers are not re-entered)."""
+    raw = request.get_data(cache=False)
+    try:
+        data = orjson.loads(raw) if raw else {}
+    except orjson.JSONDecodeError:
+        raise _bad_request("Invalid JSON body")
+    if not isinstance(data, dict):
+        raise _bad_request("JSON body must be an object")
+    return data
+
+def needs_content(allow_list: bool = False):
+    """Fail fast before any work: 500 without an API key, 400 on missing or mistyped input.
+
+    The view is called with the parsed body. `content` must be a string (stripped
+    here), or with `allow_list` also a list, whose items the view validates;
+    `audience` and `keywords`, when given, must be a string and a list of strings.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not API_KEY_CONFIGURED:
+                return jsonify({"error": "Missing OPENAI_API_KEY"}), 500
+            data = json_body()
+            content = data.get("content")
+            if isinstance(content, str):
+                content = data["content"] = content.strip()
+            elif content is not None and not (allow_list and isinstance(content, list)):
+                expected = "a string or a list of strings" if allow_list else "a string"
+                return jsonify({"error": f"content must be {expected}"}), 400
+            if not content:
+                return jsonify({"error": "Content is required"}), 400
+            if not isinstance(data.get("audience") or "", str):
+                return jsonify({"error": "audience must be a string"}), 400
+            keywords = data.get("keywords")
+            if keywords is not None and not (
+                isinstance(keywords, list) and all(isinstance(k, str) for k in keywords)
+            ):
+                return jsonify({"error": "keywords must be a list of strings"}), 400
+            return view(data, *args, **kwargs)
+        return wrapper
+    return decorator
+
+def wants_async() -> bool:
+    """True when the client asked to poll for the result (`?async=1`)."""
+    return request.args.get("async") == "1"
+
+def accepted(fn, *args):
+    """Start `fn(*args)` as a background job and answer 202 with its task id."""
+    tid = jobs.submit(fn, *args)
+    return jsonify({"task_id": tid, "status_path": f"/api/status/{tid}"}), 202
+
+# ── Streaming (SSE) ───────────────────────────────────────────────────────────
+def wants_stream() -> bool:
+    """True when the client explicitly asked for Server-Sent Events."""
+    best = request.accept_mimetypes.best_match(["application/json", "text/event-stream"])
+    return best == "text/event-stream"
+
+def sse(payload: dict) -> str:
+    return f"data: {orjson.dumps(payload).decode('utf-8')}\n\n"
+
+def sse_response(events):
+    return Response(
+        events,
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def stream_completion(create_kwargs, finalize, probe):
+    """Relay completion deltas as `token` events, then emit `finalize(text)` with done."""
+    # Flush headers before the OpenAI call so the client sees the stream open
+    # while the request waits on the rate limiter and the first token.
+    yield ": open\n\n"
+    stream = None
+    parts = []
+    try:
+        stream = create_completion(stream=True, stream_options={"include_usage": True}, **create_kwargs)
+        for chunk in stream:
+            if not chunk.choices:  # trailing usage-only chunk
+                log_usage(chunk.usage)
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                yield sse({"token": delta})
+        text = "".join(parts)
+        cache.store(probe, text)
+        yield sse({"done": True, **finalize(text)})
+    except Exception as e:
+        yield sse({"error": str(e)})
+    finally:
+        # On client disconnect this drops the upstream connection, which stops
+        # generation instead of paying for tokens nobody reads.
+        if stream is not None:
+            stream.close()
+
+def replay(text, finalize):
+    """Serve a cached completion in the same event shape as a live stream."""
+    yield sse({"token": text})
+    yield sse({"done": True, **finalize(text)})
+
+def respond(probe, finalize, fetch=fetch_text, **create_kwargs):
+    """Answer from the cache or OpenAI, as JSON or as an SSE stream.
+
+    `fetch` replaces the plain OpenAI call for non-streamed misses.
+    """
+    hit = probe.value is not None
+    if not wants_stream():
+        response = jsonify(finalize(complete(probe, fetch, **create_kwargs)))
+    elif hit:
+        response = sse_response(replay(probe.value, finalize))
+    else:
+        response = sse_response(stream_completion(create_kwargs, finalize, probe))
+    response.headers["X-Cache"] = "HIT" if hit else "MISS"
+    return response
@@ -0,0 +1,180 @@
+# backend/routes/keywords.py
+
+import os
+from types import MappingProxyType
+from typing import Mapping
+
+import orjson
+from flask import Blueprint, jsonify
+
+import cache
+from batcher import MicroBatcher
+from llm import KEYWORDS_MODEL, fetch_text, prompt_cache_key
+from preprocess import keyword_source
+from routes.common import needs_content, respond
+
+keywords_bp = Blueprint("keywords", __name__)
+
+def parse_keywords(text: str) -> list:
+    try:
+        raw = [k.strip() for k in orjson.loads(text)["keywords"]]
+    except (orjson.JSONDecodeError, KeyError, TypeError):
+        # Line-per-phrase replies cached before the switch to JSON output
+        raw = [line.strip(" -•\t") for line in text.splitlines()]
+    # Case-insensitive dedupe; the first spelling and position win
+    unique = {}
+    for k in raw:
+        if k:
+            unique.setdefault(k.lower(), k)
+    return list(unique.values())
+
+_AUDIENCE_HINT: Mapping[str, str] = MappingProxyType({
+    "general": "for a general public audience",
+    "donor": "for donors, philanthropists, and CSR leaders",
+    "journalist": "for journalists and media editors",
+    "policy": "for policy makers and advocacy professionals",
+    "csr teams": "for CSR teams and corporate social impact leads",
+})
+_DEFAULT_HINT = _AUDIENCE_HINT["general"]
+
+def audience_hint(audience: str) -> str:
+    """Prompt phrase describing the audience ("for donors, ..."); unknown ones get the general hint."""
+    return _AUDIENCE_HINT.get(audience.lower(), _DEFAULT_HINT)
+
+_KEYWORDS_SYSTEM = {"role": "system", "content": "You are an SEO keyword generator."}
+# The text comes before the audience-specific instruction, so re-running a long
+# document for another audience can reuse its cached prompt prefix.
+_KEYWORDS_PROMPT = """Text:
+\"\"\"{content}\"\"\"
+
+Extract 10 high-quality keyword phrases {hint} from the text above.
+Use multi-word phrases where possible."""
+
+_KEYWORDS_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "keywords",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {"keywords": {"type": "array", "items": {"type": "string"}}},
+            "required": ["keywords"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+def _keywords_request(content: str, audience: str):
+    """(source, audience, OpenAI arguments) for a keyword extraction."""
+    source = keyword_source(content)
+    audience = audience.lower()
+    prompt = _KEYWORDS_PROMPT.format(hint=audience_hint(audience), content=source)
+    return source, audience, {
+        "model": KEYWORDS_MODEL,
+        "messages": [
+            _KEYWORDS_SYSTEM,
+            {"role": "user", "content": prompt},
+        ],
+        "temperature": 0.3,
+        # Structured output: the reply is always {"keywords": [...]}, with no
+        # format instructions in the prompt
+        "response_format": _KEYWORDS_FORMAT,
+        "max_tokens": 256,
+        "prompt_cache_key": prompt_cache_key("keywords"),
+    }
+
+def keywords_kwargs(content: str, audience: str) -> dict:
+    """OpenAI arguments for a keyword extraction, without touching the cache."""
+    return _keywords_request(content, audience)[2]
+
+def keywords_call(content: str, audience: str):
+    """Cache probe and OpenAI arguments for a keyword extraction."""
+    source, audience, create_kwargs = _keywords_request(content, audience)
+    return cache.probe("keywords", source, KEYWORDS_MODEL, audience), create_kwargs
+
+# Opt-in micro-batching: concurrent extractions arriving within the window are
+# sent as one multi-document call. 0 (default) sends every request on its own.
+KEYWORDS_BATCH_WINDOW_MS = int(os.getenv("KEYWORDS_BATCH_WINDOW_MS", 0))
+KEYWORDS_BATCH_MAX = int(os.getenv("KEYWORDS_BATCH_MAX", 8))
+
+_BATCH_SYSTEM = {
+    "role": "system",
+    "content": "You are an SEO keyword generator. Each request below is delimited by "
+               "<<<DOC n>>>; answer every one, returning its keywords under its id.",
+}
+_BATCH_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "keywords_batch",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "results": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "id": {"type": "integer"},
+                            "keywords": {"type": "array", "items": {"type": "string"}},
+                        },
+                        "required": ["id", "keywords"],
+                        "additionalProperties": False,
+                    },
+                },
+            },
+            "required": ["results"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+def _keywords_batch(requests: list) -> list:
+    """Run several keyword extractions (keywords_call arguments) as one completion."""
+    if len(requests) == 1:
+        return [fetch_text(**requests[0])]
+    docs = "\n\n".join(
+        f"<<<DOC {i}>>>\n{kw['messages'][1]['content'].strip()}" for i, kw in enumerate(requests)
+    )
+    text = fetch_text(
+        model=KEYWORDS_MODEL,
+        messages=[_BATCH_SYSTEM, {"role": "user", "content": docs}],
+        temperature=0.3,
+        response_format=_BATCH_FORMAT,
+        max_tokens=256 * len(requests),
+        prompt_cache_key=prompt_cache_key("keywords-batch"),
+    )
+    try:
+        found = {r["id"]: r["keywords"] for r in orjson.loads(text)["results"]}
+    except (orjson.JSONDecodeError, KeyError, TypeError):
+        # Truncated or malformed reply: fall back to one call per document
+        found = {}
+    # Stored in the single-request reply format so cached values are interchangeable;
+    # anything the model skipped is fetched on its own.
+    return [
+        orjson.dumps({"keywords": found[i]}).decode("utf-8") if i in found else fetch_text(**kw)
+        for i, kw in enumerate(requests)
+    ]
+
+_batcher = (
+    MicroBatcher(_keywords_batch, KEYWORDS_BATCH_MAX, KEYWORDS_BATCH_WINDOW_MS / 1000)
+    if KEYWORDS_BATCH_WINDOW_MS else None
+)
+
+def fetch_keywords(**create_kwargs) -> str:
+    """Keyword completion text for keywords_call arguments, micro-batched when enabled."""
+    if _batcher is None:
+        return fetch_text(**create_kwargs)
+    return _batcher.submit(create_kwargs)
+
+@keywords_bp.post("/keywords")
+@needs_content()
+def generate_keywords(data):
+    audience = (data.get("audience") or "general").lower()
+    probe, create_kwargs = keywords_call(data["content"], audience)
+    try:
+        return respond(
+            probe, lambda text: {"keywords": parse_keywords(text)}, fetch=fetch_keywords, **create_kwargs
+        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,134 @@
+# backend/routes/optimize.py
+"""Keywords → rewrite in one request, for one document or a batch.
+
+/optimize chains the keyword and rewrite calls (sharing their caches with the
+individual endpoints); /analyze asks for both in a single structured-output
+call, so the source is sent and prefilled once.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import orjson
+from flask import Blueprint, jsonify
+
+import cache
+from llm import OPENAI_MODEL, complete, create_completion, log_usage, prompt_cache_key
+from preprocess import rewrite_source
+from routes.common import accepted, needs_content, wants_async
+from routes.keywords import audience_hint, fetch_keywords, keywords_call, parse_keywords
+from routes.rewrite import REWRITE_SYS, do_rewrite, finalize_rewrite
+
+optimize_bp = Blueprint("optimize", __name__)
+
+OPTIMIZE_CONCURRENCY = int(os.getenv("OPTIMIZE_CONCURRENCY", 8))
+OPTIMIZE_MAX_ITEMS = 50
+_optimize_pool = ThreadPoolExecutor(max_workers=OPTIMIZE_CONCURRENCY)
+
+def _optimize(content: str, audience: str) -> dict:
+    """Extract keywords, then rewrite with them, without a round trip to the browser."""
+    probe, create_kwargs = keywords_call(content, audience)
+    keywords = parse_keywords(complete(probe, fetch_keywords, **create_kwargs))
+    return {"keywords": keywords, **do_rewrite(content, audience, keywords)}
+
+# REWRITE_SYS stays the system message so the cached prompt prefix is shared
+# with /rewrite; the extra task and the output shape go in the user message.
+_ANALYZE_SYSTEM = {"role": "system", "content": REWRITE_SYS}
+_ANALYZE_PROMPT = """Source:
+\"\"\"{content}\"\"\"
+
+Audience: {audience}
+First extract 10 high-quality keyword phrases {hint} from the source (multi-word
+where possible), then rewrite the source using the strongest of them as primary
+keywords. Put the phrases in "keywords" and the article HTML in "html"."""
+_ANALYZE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "analysis",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "keywords": {"type": "array", "items": {"type": "string"}},
+                "html": {"type": "string"},
+            },
+            "required": ["keywords", "html"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+def _fetch_analysis(**create_kwargs) -> str:
+    """Completion text for an analysis, raising instead of returning a reply that
+    would break on parsing, so a truncated or malformed one is never cached."""
+    response = create_completion(**create_kwargs)
+    log_usage(response.usage)
+    choice = response.choices[0]
+    if choice.finish_reason == "length":
+        raise ValueError("Analysis was cut off at the output limit; try shorter content")
+    text = choice.message.content
+    result = orjson.loads(text)  # JSONDecodeError is a ValueError
+    if not isinstance(result.get("keywords"), list) or not isinstance(result.get("html"), str):
+        raise ValueError("Analysis reply is missing keywords or html")
+    return text
+
+def _analyze(content: str, audience: str) -> dict:
+    """Keywords and rewrite from one OpenAI call."""
+    content = rewrite_source(content)
+    prompt = _ANALYZE_PROMPT.format(content=content, audience=audience, hint=audience_hint(audience))
+    probe = cache.probe("analyze", content, OPENAI_MODEL, audience)
+    text = complete(
+        probe,
+        _fetch_analysis,
+        messages=[_ANALYZE_SYSTEM, {"role": "user", "content": prompt}],
+        temperature=0.2,
+        response_format=_ANALYZE_FORMAT,
+        prompt_cache_key=prompt_cache_key("analyze"),
+    )
+    return {"keywords": parse_keywords(text), **finalize_rewrite(orjson.loads(text)["html"])}
+
+def _optimize_item(content: str, audience: str) -> dict:
+    try:
+        return _optimize(content, audience)
+    except Exception as e:
+        return {"error": str(e)}
+
+def _optimize_many(contents: list, audience: str) -> dict:
+    """Optimize documents concurrently; results keep the input order."""
+    return {"data": list(_optimize_pool.map(lambda c: _optimize_item(c, audience), contents))}
+
+@optimize_bp.post("/optimize")
+@needs_content(allow_list=True)
+def optimize(data):
+    content = data["content"]
+    audience = (data.get("audience") or "general").strip()
+
+    # Bulk: a list of documents fans out over a bounded pool, results in order
+    if isinstance(content, list):
+        contents = [(c or "").strip() for c in content if isinstance(c, str)]
+        if not contents or len(contents) != len(content) or not all(contents):
+            return jsonify({"error": "content must be a non-empty list of non-empty strings"}), 400
+        if len(contents) > OPTIMIZE_MAX_ITEMS:
+            return jsonify({"error": f"At most {OPTIMIZE_MAX_ITEMS} items per request"}), 400
+        if wants_async():
+            return accepted(_optimize_many, contents, audience)
+        return jsonify(_optimize_many(contents, audience))
+
+    if wants_async():
+        return accepted(lambda: {"data": _optimize(content, audience)})
+    try:
+        return jsonify({"data": _optimize(content, audience)})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@optimize_bp.post("/analyze")
+@needs_content()
+def analyze(data):
+    content = data["content"]
+    audience = (data.get("audience") or "general").strip()
+    if wants_async():
+        return accepted(lambda: {"data": _analyze(content, audience)})
+    try:
+        return jsonify({"data": _analyze(content, audience)})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
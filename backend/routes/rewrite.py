@@ -1,50 +1,184 @@
+# backend/routes/rewrite.py
 
-from flask import Blueprint, request, jsonify, send_file
-import os, tempfile, time
-from openai import OpenAI
+import re
+
+from flask import Blueprint, Response, jsonify
+
+import cache
+import downloads
+from llm import OPENAI_MODEL, complete, prompt_cache_key
+from preprocess import rewrite_source
+from routes.common import accepted, needs_content, respond, wants_async
 
 rewrite_bp = Blueprint("rewrite", __name__)
-client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
 
-SYS = """Rewrite content into clean, semantic HTML5 with:
+# Kept byte-for-byte stable and sent first so OpenAI's automatic prompt caching
+# (prefixes of 1024+ tokens) can reuse it; per-request details go at the end of
+# the user message.
+REWRITE_SYS = """Rewrite content into clean, semantic HTML5 with:
 - <article> wrapper, proper <h1..h3>, lists, <section>, <figure>/<figcaption> for images,
-- accessibility-minded (aria-labels only when needed), 
+- accessibility-minded (aria-labels only when needed),
 - no external CSS/JS, minimal inline styles,
 - preserve links, add alt text placeholders if missing.
-Return ONLY the HTML inside <article>...</article>."""
+Return ONLY the HTML inside <article>...</article>.
 
-@rewrite_bp.post("/rewrite")
-def rewrite():
-    b = request.get_json(force=True)
-    src = b.get("content","")
-    audience = b.get("audience","General")
-    r = client.chat.completions.create(
-        model=os.environ.get("OPENAI_MODEL","gpt-4o-mini"),
-        temperature=0.2,
-        messages=[
-            {"role":"system","content":SYS},
-            {"role":"user","content": f"Audience: {audience}\n\nSource:\n{src}"}
-        ]
-    )
-    article_html = r.choices[0].message.content.strip()
-    # Wrap into a full page
-    page = f"""<!doctype html>
+STYLE GUIDE
+
+Document structure
+1. Wrap everything in a single <article>. Do not emit <html>, <head>, <body>, <main>, <header> or <footer> for the page itself.
+2. Use exactly one <h1>, taken from the source title or, if there is none, a concise title that states the main topic in plain words.
+3. Group related paragraphs into <section> elements. Each <section> starts with an <h2>. Use <h3> only for sub-topics inside a section; never skip heading levels.
+4. Headings are short (ideally under 70 characters), descriptive and specific. Prefer statements or questions a reader would search for over clever wordplay.
+5. Open the article with a short summary paragraph (two or three sentences) directly after the <h1> that answers who, what and why.
+
+Paragraphs and readability
+6. Keep paragraphs to one idea and roughly 40 to 90 words. Split longer paragraphs at natural topic boundaries.
+7. Prefer active voice, concrete nouns and plain verbs. Remove filler, repetition and throat-clearing introductions without dropping facts.
+8. Keep every fact, figure, date, name, quotation and claim from the source. Do not invent statistics, sources, quotes or outcomes.
+9. Keep the author's meaning and tone. Rephrase for clarity, but do not change the position the source takes.
+10. Spell out an acronym on first use, followed by the acronym in parentheses, unless it is universally known.
+
+Lists, tables and emphasis
+11. Turn inline enumerations of three or more parallel items into <ul>, or into <ol> when order matters (steps, rankings, timelines).
+12. Use a <table> with <thead>, <tbody> and <th scope="col"> only for genuinely tabular data that compares items across the same attributes.
+13. Use <strong> for the few phrases a skimming reader must not miss, and <em> for stress. Never use <b>, <i>, <u> or <font>.
+14. Use <blockquote> with a <cite> or attribution line for direct quotations longer than one sentence; use <q> for short inline quotes.
+15. Mark up dates and times with <time datetime="YYYY-MM-DD"> when the source gives an exact date.
+
+Links
+16. Preserve every link from the source with its original href. Use descriptive anchor text; never "click here" or a bare URL when a description exists.
+17. Do not add new external links. Do not add target, rel or tracking attributes unless they were in the source.
+
+Images and media
+18. Put each image in a <figure> with an <img> and a <figcaption> when the source provides a caption or credit.
+19. Every <img> has an alt attribute. Keep existing alt text; otherwise write alt="[Describe image: ...]" with a short hint from the surrounding text.
+20. Do not invent images that are not referenced in the source.
+
+Accessibility
+21. Rely on native semantics first. Add aria-label only where an element would otherwise have no accessible name, such as an icon-only link.
+22. Do not use role attributes that duplicate native semantics, and never put interactive elements inside headings.
+23. Keep reading order identical to visual order; do not use CSS to reorder content.
+
+Search and answer-engine readiness
+24. Work the primary keywords, when given, into the <h1>, the summary paragraph and at least one <h2> where it reads naturally. Never stuff keywords or list them.
+25. Where the source answers common questions, phrase an <h2> or <h3> as the question and answer it in the first sentence beneath it.
+26. End with a short concluding <section> (for example "Key takeaways" or "What happens next") when the source supports one, using a <ul> of the main points.
+
+Audience
+27. General: plain language, short sentences, explain jargon the first time it appears.
+28. Donor or CSR: lead with impact and outcomes, make the need and the result of support explicit, keep figures prominent.
+29. Journalist: lead with the news line, keep names, dates, figures and attributable quotes easy to lift, avoid promotional language.
+30. Policy: lead with the issue and the recommendation, keep evidence and sources explicit, use neutral and precise wording.
+
+Output format
+31. Output raw HTML only: no Markdown, no code fences, no commentary before or after the <article>.
+32. Do not include <style>, <script>, <link>, <iframe> or event-handler attributes. Inline style attributes only where essential for meaning.
+33. Use UTF-8 characters directly (curly quotes, dashes, accented letters); escape only &, < and > where required in text.
+34. Indent nested elements consistently with two spaces and keep each block-level element on its own line."""
+
+# Static page around the rewritten <article>, encoded once at import
+_REWRITE_PAGE_HEAD = """<!DOCTYPE html>
 <html lang="en">
-<meta charset="utf-8" />
-<meta name="viewport" content="width=device-width,initial-scale=1" />
-<title>Rewritten Content</title>
+<head>
+  <meta charset="UTF-8" />
+  <meta name="viewport" content="width=device-width,initial-scale=1" />
+  <title>Rewritten Content</title>
+</head>
 <body>
-{article_html}
-</body></html>"""
-    tmp = tempfile.NamedTemporaryFile("w", delete=False, suffix=".html", prefix="rewrite_")
-    tmp.write(page); tmp.close()
-    fid = os.path.basename(tmp.name)
-    url = f"/api/rewrite/download/{fid}"
-    return jsonify({"data":{"html_block": article_html, "download_path": url}})
+""".encode("utf-8")
+_REWRITE_PAGE_TAIL = """
+</body>
+</html>""".encode("utf-8")
+
+def _wrap_full_html(article_html: str) -> bytes:
+    return _REWRITE_PAGE_HEAD + article_html.encode("utf-8") + _REWRITE_PAGE_TAIL
+
+_FENCE_OPEN = re.compile(r"^```[a-zA-Z]*\s*")
+_FENCE_CLOSE = re.compile(r"\n?```$")
+
+def clean_rewrite(raw: str) -> str:
+    """The <article> HTML from a rewrite reply, without code fences."""
+    article_html = raw.strip()
+    # Strip fences if model wrapped in ```html
+    if article_html.startswith("```"):
+        article_html = _FENCE_OPEN.sub("", article_html)
+        article_html = _FENCE_CLOSE.sub("", article_html)
+    # Fallback: if no tags detected, wrap minimally
+    if "<" not in article_html and "</" not in article_html:
+        article_html = f"<article><p>{article_html}</p></article>"
+    return article_html
+
+def finalize_rewrite(raw: str) -> dict:
+    """Clean the model output and store the full page for download."""
+    article_html = clean_rewrite(raw)
+
+    # Build a full HTML page and keep it in memory for the download endpoint
+    fid = downloads.put(_wrap_full_html(article_html))
+    download_path = f"/api/rewrite/download/{fid}"
+
+    return {"html_block": article_html, "download_path": download_path}
+
+_REWRITE_SYSTEM = {"role": "system", "content": REWRITE_SYS}
+_REWRITE_PROMPT = """Source:
+\"\"\"{content}\"\"\"
+
+Audience: {audience}
+Primary keywords (optional): {primary}"""
+
+def _rewrite_request(content: str, audience: str, keywords: list):
+    """(source, primary keywords, OpenAI arguments) for a rewrite."""
+    source = rewrite_source(content)
+    primary = ", ".join([k for k in keywords][:5]) if keywords else ""
+    user_prompt = _REWRITE_PROMPT.format(content=source, audience=audience, primary=primary)
+    return source, primary, {
+        "messages": [_REWRITE_SYSTEM, {"role": "user", "content": user_prompt}],
+        "temperature": 0.2,
+        "prompt_cache_key": prompt_cache_key("rewrite"),
+    }
+
+def rewrite_kwargs(content: str, audience: str, keywords: list) -> dict:
+    """OpenAI arguments for a rewrite, without touching the cache."""
+    return _rewrite_request(content, audience, keywords)[2]
+
+def rewrite_call(content: str, audience: str, keywords: list):
+    """Cache probe and OpenAI arguments for a rewrite."""
+    source, primary, create_kwargs = _rewrite_request(content, audience, keywords)
+    return cache.probe("rewrite", source, OPENAI_MODEL, audience, primary), create_kwargs
+
+def do_rewrite(content: str, audience: str, keywords: list) -> dict:
+    """Rewrite without streaming; returns {html_block, download_path}."""
+    probe, create_kwargs = rewrite_call(content, audience, keywords)
+    return finalize_rewrite(complete(probe, **create_kwargs))
+
+def rewrite_args(data: dict):
+    """(content, audience, keywords) from a rewrite request body."""
+    content = (data.get("content") or "").strip()
+    audience = (data.get("audience") or "General").strip()
+    keywords = data.get("keywords", [])
+    return content, audience, keywords
+
+@rewrite_bp.post("/rewrite")
+@needs_content()
+def rewrite(data):
+    content, audience, keywords = rewrite_args(data)
+
+    if wants_async():
+        return accepted(lambda: {"data": do_rewrite(content, audience, keywords)})
+
+    probe, create_kwargs = rewrite_call(content, audience, keywords)
+    try:
+        return respond(probe, lambda text: {"data": finalize_rewrite(text)}, **create_kwargs)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
 @rewrite_bp.get("/rewrite/download/<fid>")
-def dl(fid):
-    path = os.path.join(tempfile.gettempdir(), fid)
-    if not os.path.exists(path):
-        return jsonify({"errors":["File not found"]}), 404
-    return send_file(path, mimetype="text/html", as_attachment=True, download_name="rewritten.html")
+def download(fid):
+    page = downloads.get(fid)
+    if page is None:
+        return jsonify({"error": "File not found"}), 404
+    # The page is already whole bytes in memory: send it as one body rather than
+    # through send_file's file wrapper, which copies it out in 8 KB reads.
+    return Response(
+        page, mimetype="text/html",
+        headers={"Content-Disposition": 'attachment; filename="rewritten.html"'},
+    )
@@ -0,0 +1,15 @@
+# backend/routes/status.py
+"""Polling endpoint for requests submitted with `?async=1`."""
+
+from flask import Blueprint, jsonify
+
+import jobs
+
+status_bp = Blueprint("status", __name__)
+
+@status_bp.get("/status/<tid>")
+def task_status(tid):
+    state = jobs.status(tid)
+    if state is None:
+        return jsonify({"error": "Unknown task"}), 404
+    return jsonify(state)
@@ -1,17 +1,21 @@
 // src/App.jsx
-import React, { useState } from 'react'
+import React, { useMemo, useState } from 'react'
 import DOMPurify from 'dompurify'
 
 // Shared helpers
-import { apiFetch, postRewrite } from '@/lib/api'
+import { streamKeywords, streamRewrite } from '@/lib/api'
 import { withRetry } from '@/lib/retry'
 import { KeywordsSchema, RewriteSchema } from '@/lib/schemas'
 
 // Output component (download + copy)
 import { RewriteOutput } from '@/features/rewrite/Output'
 
-const escapeHtml = (s) =>
-  (s || '').replaceAll('&', '&amp;').replaceAll('<', '&lt;').replaceAll('>', '&gt;')
+const HTML_ESCAPES = { '&': '&amp;', '<': '&lt;', '>': '&gt;' }
+const escapeHtml = (s) => (s || '').replace(/[&<>]/g, (c) => HTML_ESCAPES[c])
+
+// Completed array items of a streamed {"keywords": [...]} reply
+const parseKeywordStream = (text) =>
+  [...text.matchAll(/"((?:[^"\\]|\\.)*)"(?=\s*[,\]])/g)].map((m) => JSON.parse(`"${m[1]}"`))
 
 export default function App() {
   const [originalText, setOriginalText] = useState('')
@@ -19,24 +23,27 @@ export default function App() {
   const [keywords, setKeywords] = useState([])
   const [approvedKeywords, setApprovedKeywords] = useState([])
   const [rewriteResult, setRewriteResult] = useState(null) // { html_block, download_path }
+  const [draftHtml, setDraftHtml] = useState('') // streamed HTML while rewriting
   const [loadingKeywords, setLoadingKeywords] = useState(false)
   const [loadingRewrite, setLoadingRewrite] = useState(false)
   const [error, setError] = useState('')
 
-  const renderedPreview = rewriteResult?.html_block
-    ? DOMPurify.sanitize(rewriteResult.html_block)
-    : ''
+  const htmlSource = rewriteResult?.html_block || draftHtml
+  // Sanitize/escape only when the HTML changes, not on every keystroke elsewhere
+  const renderedPreview = useMemo(() => (htmlSource ? DOMPurify.sanitize(htmlSource) : ''), [htmlSource])
+  const escapedSource = useMemo(() => escapeHtml(htmlSource), [htmlSource])
 
-  // Step 1 — Generate keywords (validated via Zod)
+  // Step 1 — Generate keywords (streamed, validated via Zod)
   const genKeywords = async () => {
     setError('')
     setLoadingKeywords(true)
     setKeywords([]); setApprovedKeywords([])
     try {
-      const json = await apiFetch('/keywords', {
-        method: 'POST',
-        body: JSON.stringify({ content: originalText, audience }),
-      }, 30000)
+      let text = ''
+      const json = await streamKeywords({ content: originalText, audience }, (token) => {
+        text += token
+        setKeywords(parseKeywordStream(text))
+      })
 
       const { keywords } = KeywordsSchema.parse(json)
       setKeywords(keywords)
@@ -48,28 +55,31 @@ export default function App() {
     }
   }
 
-  // Step 2 — Rewrite to semantic HTML (retry + validate via Zod)
+  // Step 2 — Rewrite to semantic HTML (streamed, retry + validate via Zod)
   const rewriteToHtml = async () => {
     setError('')
     setLoadingRewrite(true)
     setRewriteResult(null)
     try {
-      const json = await withRetry(
-        () => postRewrite({ content: originalText, keywords: approvedKeywords, audience }),
-        2 // attempts
-      )
+      const json = await withRetry(() => {
+        let html = ''
+        setDraftHtml('')
+        return streamRewrite(
+          { content: originalText, keywords: approvedKeywords, audience },
+          (token) => setDraftHtml((html += token))
+        )
+      }, 2) // attempts
 
       const { data } = RewriteSchema.parse(json) // { html_block, download_path }
       setRewriteResult(data)
     } catch (e) {
       setError(String(e.message || e))
     } finally {
+      setDraftHtml('')
       setLoadingRewrite(false)
     }
   }
 
-  const htmlSource = rewriteResult?.html_block || ''
-
   return (
     <div className="min-h-screen bg-gray-50 py-10">
       <div className="max-w-4xl mx-auto px-4">
@@ -151,18 +161,18 @@ export default function App() {
           )}
 
           {/* Step 3 — Output */}
-          {rewriteResult && (
+          {htmlSource && (
             <section className="mt-8">
               <h2 className="text-xl font-semibold mb-3">Step 3 — Output</h2>
 
               {/* Download + Copy + Preview */}
-              <RewriteOutput result={rewriteResult} />
+              {rewriteResult && <RewriteOutput result={rewriteResult} />}
 
               {/* Optional raw HTML (sanitised display) */}
               <div className="mt-6">
                 <h3 className="font-semibold mb-2">HTML Source</h3>
                 <pre className="text-xs bg-gray-50 border rounded p-3 overflow-auto">
-                  {escapeHtml(htmlSource)}
+                  {escapedSource}
                 </pre>
               </div>
 
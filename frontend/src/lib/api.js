@@ -31,6 +31,50 @@ export async function apiFetch(path, options = {}, timeoutMs = 20000) {
   }
 }
 
+// Server-Sent Events over POST: calls onToken(token) per streamed chunk and
+// resolves with the final `done` event payload.
+export async function apiStream(path, body, onToken, timeoutMs = 120000) {
+  const controller = new AbortController();
+  const timer = setTimeout(() => controller.abort(), timeoutMs);
+
+  try {
+    const res = await fetch(`${API_BASE}${path}`, {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+        Accept: "text/event-stream",
+      },
+      body: JSON.stringify(body),
+      signal: controller.signal,
+    });
+    if (!res.ok) throw new Error(`HTTP ${res.status}: ${await res.text()}`);
+
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let sep;
+      while ((sep = buffer.indexOf("\n\n")) !== -1) {
+        const frame = buffer.slice(0, sep);
+        buffer = buffer.slice(sep + 2);
+        if (!frame.startsWith("data: ")) continue;
+
+        const event = JSON.parse(frame.slice(6));
+        if (event.error) throw new Error(event.error);
+        if (event.done) return event;
+        if (event.token) onToken?.(event.token);
+      }
+    }
+    throw new Error("Stream ended unexpectedly");
+  } finally {
+    clearTimeout(timer);
+  }
+}
+
 // ✅ All your backend endpoints collected here
 export const getTrends   = (p) => apiFetch("/keyword-trends", { method:"POST", body: JSON.stringify(p) });
 export const getMetadata = (p) => apiFetch("/metadata",       { method:"POST", body: JSON.stringify(p) });
@@ -38,3 +82,6 @@ export const getSchema   = (p) => apiFetch("/schema",         { method:"POST", b
 export const getSocial   = (p) => apiFetch("/social",         { method:"POST", body: JSON.stringify(p) });
 export const postRewrite = (p) => apiFetch("/rewrite",        { method:"POST", body: JSON.stringify(p) });
 
+export const streamKeywords = (p, onToken) => apiStream("/keywords", p, onToken, 30000);
+export const streamRewrite  = (p, onToken) => apiStream("/rewrite",  p, onToken);
+